@@ -1,17 +1,33 @@
 from __future__ import annotations
 
-import sys
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import os
 import json
 import random
+import atexit
+import contextlib
+import dataclasses
+import functools
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 import typer
 
-from .config import AppConfig
-from .generator import ContentGenerator
-from .twitter_client import TwitterClient
-from filelock import FileLock
+from .config import AppConfig, reset_dotenv
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime so commands only pay for the clients they use
+    from .generator import ContentGenerator
+    from .twitter_client import TwitterClient
 
 
 def _author_slug(raw: str) -> str:
@@ -120,27 +136,116 @@ def _pick_author_image(author: str) -> Optional[bytes]:
 app = typer.Typer(help="AI-powered Twitter bot CLI")
 
 
-ENGINE_CHOICES = ["auto", "provider", "ollama", "hf", "fallback"]
+@app.callback()
+def main(
+    # Only matters when the app is invoked repeatedly in one process; a fresh CLI run has nothing cached
+    reload_config: bool = typer.Option(
+        False,
+        "--reload-config",
+        help="Discard config and clients cached earlier in this process; .env only fills variables that are not already set",
+    ),
+):
+    if reload_config:
+        reset_dotenv()
+        _load_config.cache_clear()
+        _load_generator.cache_clear()
+        _load_twitter.cache_clear()
+
+
+_ENGINE_ORDER = ("auto", "provider", "ollama", "hf", "fallback")
+ENGINE_CHOICES = frozenset(_ENGINE_ORDER)
+_ENGINE_CHOICES_STR = ", ".join(_ENGINE_ORDER)
+
+
+def _normalize_engine(engine: str) -> str:
+    e = engine.lower()
+    if e not in ENGINE_CHOICES:
+        raise typer.BadParameter(f"engine must be one of: {_ENGINE_CHOICES_STR}")
+    return e
+
+
+@functools.lru_cache(maxsize=1)
+def _load_config() -> AppConfig:
+	# One env/.env parse per process; cleared by --reload-config
+	return AppConfig.load()
 
 
-def _load_components() -> tuple[AppConfig, ContentGenerator, TwitterClient]:
-	config = AppConfig.load()
-	generator = ContentGenerator(config)
-	twitter = TwitterClient(config)
-	return config, generator, twitter
+@functools.lru_cache(maxsize=1)
+def _load_generator() -> ContentGenerator:
+	from .generator import ContentGenerator
+	return ContentGenerator(_load_config())
 
 
-def _truncate_to_limit(text: str, limit: int) -> str:
-    limit = min(max(limit, 1), 275)
-    return text[:limit]
+@functools.lru_cache(maxsize=1)
+def _load_twitter() -> TwitterClient:
+	# tweepy (and its requests stack) is only imported by commands that post
+	from .twitter_client import TwitterClient
+	twitter = TwitterClient(_load_config())
+	atexit.register(twitter.close)
+	return twitter
 
 
-def _sanitize_no_emdash(text: str) -> str:
-    # Replace em dash and en dash with a simple hyphen or space
-    sanitized = text.replace("—", "-").replace("–", "-")
-    # Avoid fancy quotes; normalize basic quotes
-    sanitized = sanitized.replace("“", '"').replace("”", '"').replace("’", "'")
-    return sanitized
+_DEFAULT_FACT_PROMPT = "Make up any interesting fact."
+_THREAD_FACTS_PROMPT = "Make up 10 interesting facts on different topics."
+
+
+def _generate_tweet(generator: ContentGenerator, prompt: str, engine: str) -> str:
+    """Generate one fact, already sanitized and cut to the tweet limit by the generator."""
+    return generator.generate(prompt, preferred_engine=engine)
+
+
+@contextlib.contextmanager
+def _state_lock(path: str):
+    """Hold an exclusive OS-level lock for a state file.
+
+    The lock lives on a <path>.lock sidecar rather than the file itself because writes
+    swap the file's inode with os.replace. Blocks in the kernel; closing the fd releases it.
+    """
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def _json_dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode("utf-8")
+
+
+def _json_loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _read_json(path: str):
+    with _state_lock(path), open(path, "rb") as f:
+        return _json_loads(f.read())
+
+
+def _write_json_atomic(path: str, data) -> None:
+    """Write JSON to path via temp file + fsync + os.replace, under the file's lock.
+
+    Readers never see a half-written file, and a crash mid-write leaves the old state intact.
+    """
+    tmp = path + ".tmp"
+    with _state_lock(path):
+        with open(tmp, "wb") as f:
+            f.write(_json_dumps(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
 
 
 # Legacy state (kept for compatibility of recent cache only)
@@ -151,11 +256,9 @@ def _cycle_state_path() -> str:
 def _read_cycle_index() -> int:
     path = _cycle_state_path()
     try:
-        lock = FileLock(path + ".lock")
-        with lock, open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            idx = int(data.get("index", 0))
-            return max(0, idx)
+        data = _read_json(path)
+        idx = int(data.get("index", 0))
+        return max(0, idx)
     except Exception:
         return 0
 
@@ -163,9 +266,7 @@ def _read_cycle_index() -> int:
 def _write_cycle_index(idx: int) -> None:
     path = _cycle_state_path()
     try:
-        lock = FileLock(path + ".lock")
-        with lock, open(path, "w", encoding="utf-8") as f:
-            json.dump({"index": max(0, int(idx))}, f)
+        _write_json_atomic(path, {"index": max(0, int(idx))})
     except Exception:
         pass
 
@@ -185,11 +286,9 @@ def _thread_state_path() -> str:
 def _read_recent_posts() -> list[str]:
     path = _recent_posts_path()
     try:
-        lock = FileLock(path + ".lock")
-        with lock, open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                return [str(x) for x in data][-200:]
+        data = _read_json(path)
+        if isinstance(data, list):
+            return [str(x) for x in data][-200:]
     except Exception:
         pass
     return []
@@ -198,9 +297,7 @@ def _read_recent_posts() -> list[str]:
 def _write_recent_posts(items: list[str]) -> None:
     path = _recent_posts_path()
     try:
-        lock = FileLock(path + ".lock")
-        with lock, open(path, "w", encoding="utf-8") as f:
-            json.dump(items[-200:], f)
+        _write_json_atomic(path, items[-200:])
     except Exception:
         pass
 
@@ -208,10 +305,8 @@ def _write_recent_posts(items: list[str]) -> None:
 def _read_post_counter() -> int:
     path = _thread_state_path()
     try:
-        lock = FileLock(path + ".lock")
-        with lock, open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return int(data.get("since_last_thread", 0))
+        data = _read_json(path)
+        return int(data.get("since_last_thread", 0))
     except Exception:
         return 0
 
@@ -219,9 +314,7 @@ def _read_post_counter() -> int:
 def _write_post_counter(val: int) -> None:
     path = _thread_state_path()
     try:
-        lock = FileLock(path + ".lock")
-        with lock, open(path, "w", encoding="utf-8") as f:
-            json.dump({"since_last_thread": max(0, int(val))}, f)
+        _write_json_atomic(path, {"since_last_thread": max(0, int(val))})
     except Exception:
         pass
 
@@ -248,12 +341,13 @@ def post_text(
 	),
 ):
 	"""Post provided text as a tweet (no generation)."""
-	config, _, twitter = _load_components()
+	config = _load_config()
 	use_dry_run = config.dry_run_default if dry_run is None else dry_run
 	print(text)
 	if use_dry_run:
 		print("[dry-run] Skipping post.")
 		return
+	twitter = _load_twitter()
 	tweet_id = twitter.post_tweet(text)
 	if tweet_id:
 		print(f"Posted tweet id: {tweet_id}")
@@ -264,7 +358,7 @@ def post_text(
 @app.command()
 def health():
 	"""Check basic configuration and environment."""
-	config, _, _ = _load_components()
+	config = _load_config()
 	missing = []
 	if not config.twitter_api_key:
 		missing.append("TWITTER_API_KEY")
@@ -286,14 +380,17 @@ def generate_fact(
     engine: str = typer.Option("auto", help="Choose generation engine", case_sensitive=False),
 ):
     """Generate a single 'Did you know ...' fact and print to stdout."""
-    if engine.lower() not in ENGINE_CHOICES:
-        raise typer.BadParameter(f"engine must be one of: {', '.join(ENGINE_CHOICES)}")
-    config, generator, _ = _load_components()
+    engine = _normalize_engine(engine)
+    config = _load_config()
     if max_length is not None:
-        config.max_length = max_length
-    prompt = subject.strip() if subject else "Make up any interesting fact."
-    text = generator.generate(prompt, preferred_engine=engine)
-    print(_truncate_to_limit(_sanitize_no_emdash(text), config.max_length))
+        # Copy so the override doesn't leak into the cached config/generator
+        from .generator import ContentGenerator
+        config = dataclasses.replace(config, max_length=max_length)
+        generator = ContentGenerator(config)
+    else:
+        generator = _load_generator()
+    prompt = subject.strip() if subject else _DEFAULT_FACT_PROMPT
+    print(_generate_tweet(generator, prompt, engine))
 
 
 @app.command("post-fact")
@@ -307,17 +404,17 @@ def post_fact(
     subject: Optional[str] = typer.Argument(None, help="Optional subject for the fact"),
 ):
     """Generate and post a 'Did you know ...' fact."""
-    if engine.lower() not in ENGINE_CHOICES:
-        raise typer.BadParameter(f"engine must be one of: {', '.join(ENGINE_CHOICES)}")
-    config, generator, twitter = _load_components()
+    engine = _normalize_engine(engine)
+    config = _load_config()
+    generator = _load_generator()
     use_dry_run = config.dry_run_default if dry_run is None else dry_run
-    base = subject.strip() if subject else "Make up any interesting fact."
-    text = generator.generate(base, preferred_engine=engine)
-    tweet = _truncate_to_limit(_sanitize_no_emdash((text or '').strip()), config.max_length)
+    base = subject.strip() if subject else _DEFAULT_FACT_PROMPT
+    tweet = _generate_tweet(generator, base, engine)
     print(tweet)
     if use_dry_run:
         print("[dry-run] Skipping post.")
         return
+    twitter = _load_twitter()
     tweet_id = twitter.post_tweet(tweet)
     if tweet_id:
         print(f"Posted tweet id: {tweet_id}")
@@ -330,14 +427,19 @@ def post_fact(
         if count >= 15:
             facts: list[str] = []
             seen = set(cache[-500:])
-            for _ in range(50):  # up to 50 attempts to gather 10 unique facts
-                cand = generator.generate("Make up any interesting fact.", preferred_engine=engine)
-                cand = _truncate_to_limit(_sanitize_no_emdash((cand or '').strip()), config.max_length)
+            # One batched request first; top up one fact at a time only if it came back short
+            for cand in generator.generate_many(_THREAD_FACTS_PROMPT, 10, preferred_engine=engine):
                 if cand and cand not in seen:
                     facts.append(cand)
                     seen.add(cand)
-                if len(facts) == 10:
+            for _ in range(50):  # up to 50 attempts to gather 10 unique facts
+                if len(facts) >= 10:
                     break
+                cand = _generate_tweet(generator, _DEFAULT_FACT_PROMPT, engine)
+                if cand and cand not in seen:
+                    facts.append(cand)
+                    seen.add(cand)
+            facts = facts[:10]
             if facts:
                 head = "10 interesting things you didn’t know until now:"
                 thread_texts = [head] + [f"{i+1}. {t}" for i, t in enumerate(facts)]
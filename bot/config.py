@@ -1,13 +1,21 @@
 from __future__ import annotations
 
 import os
+import functools
+from dataclasses import dataclass
 from typing import Optional
 
-from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from .util import TWEET_MAX_CHARS
 
-class AppConfig(BaseModel):
+
+# .env is read once per process (until reset_dotenv()); later AppConfig.load() calls only read os.environ
+_DOTENV_LOADED = False
+
+
+@dataclass(slots=True, frozen=True)
+class AppConfig:
 	# Twitter/X credentials
 	twitter_api_key: Optional[str] = None
 	twitter_api_key_secret: Optional[str] = None
@@ -23,7 +31,12 @@ class AppConfig(BaseModel):
 	# Content generation
 	ollama_model: str = "qwen2.5:3b-instruct"
 	hf_model: Optional[str] = None
+	hf_onnx_dir: Optional[str] = None  # opt-in ONNX export of HF_MODEL, used instead of PyTorch when set
+	hf_quantize: bool = True  # int8 dynamic quantization for the PyTorch model on CPU
+	enable_hf: bool = False  # let --engine auto fall through to the local Transformers model
 	max_length: int = 220
+	engine_timeout: float = 30.0  # seconds auto mode waits on an engine before moving down the chain
+	batch_timeout: float = 180.0  # same bound for a multi-fact batch request in auto mode
 
 	# Behavior
 	dry_run_default: bool = True
@@ -31,23 +44,71 @@ class AppConfig(BaseModel):
 
 	# Image generation removed
 
+	@property
+	def tweet_limit(self) -> int:
+		return min(max(self.max_length, 1), TWEET_MAX_CHARS)
+
 	@classmethod
 	def load(cls) -> "AppConfig":
 		# Load .env if present
-		load_dotenv(override=False)
-
-		return cls(
-			twitter_api_key=os.getenv("TWITTER_API_KEY"),
-			twitter_api_key_secret=os.getenv("TWITTER_API_KEY_SECRET"),
-			twitter_access_token=os.getenv("TWITTER_ACCESS_TOKEN"),
-			twitter_access_token_secret=os.getenv("TWITTER_ACCESS_TOKEN_SECRET"),
-			twitter_bearer_token=os.getenv("TWITTER_BEARER_TOKEN"),
-			provider_api_key=os.getenv("PROVIDER_API_KEY"),
-			provider_base_url=os.getenv("PROVIDER_BASE_URL"),
-			provider_model=os.getenv("PROVIDER_MODEL"),
-			ollama_model=os.getenv("OLLAMA_MODEL", "qwen2.5:3b-instruct"),
-			hf_model=os.getenv("HF_MODEL", "Qwen/Qwen2.5-1.5B-Instruct"),
-			max_length=int(os.getenv("MAX_LENGTH", "220")),
-			dry_run_default=os.getenv("DRY_RUN_DEFAULT", "true").lower() == "true",
-			twitter_wait_on_rate_limit=os.getenv("TWITTER_WAIT_ON_RATE_LIMIT", "false").lower() == "true",
-		)
+		global _DOTENV_LOADED
+		if not _DOTENV_LOADED:
+			load_dotenv(override=False)
+			_DOTENV_LOADED = True
+
+		# Rebuild only when one of the variables we read has changed
+		return _load_cached(tuple(os.environ.get(key) for key in _ENV_KEYS))
+
+
+def reset_dotenv() -> None:
+	"""Make the next AppConfig.load() read .env again (used by --reload-config)."""
+	global _DOTENV_LOADED
+	_DOTENV_LOADED = False
+
+
+# Every environment variable AppConfig reads; their values form the load() cache key
+_ENV_KEYS = (
+	"TWITTER_API_KEY",
+	"TWITTER_API_KEY_SECRET",
+	"TWITTER_ACCESS_TOKEN",
+	"TWITTER_ACCESS_TOKEN_SECRET",
+	"TWITTER_BEARER_TOKEN",
+	"PROVIDER_API_KEY",
+	"PROVIDER_BASE_URL",
+	"PROVIDER_MODEL",
+	"OLLAMA_MODEL",
+	"HF_MODEL",
+	"HF_ONNX_DIR",
+	"HF_QUANTIZE",
+	"ENABLE_HF",
+	"MAX_LENGTH",
+	"ENGINE_TIMEOUT",
+	"BATCH_TIMEOUT",
+	"DRY_RUN_DEFAULT",
+	"TWITTER_WAIT_ON_RATE_LIMIT",
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_cached(fingerprint: tuple[Optional[str], ...]) -> AppConfig:
+	env = {key: value for key, value in zip(_ENV_KEYS, fingerprint) if value is not None}
+	return AppConfig(
+		twitter_api_key=env.get("TWITTER_API_KEY"),
+		twitter_api_key_secret=env.get("TWITTER_API_KEY_SECRET"),
+		twitter_access_token=env.get("TWITTER_ACCESS_TOKEN"),
+		twitter_access_token_secret=env.get("TWITTER_ACCESS_TOKEN_SECRET"),
+		twitter_bearer_token=env.get("TWITTER_BEARER_TOKEN"),
+		provider_api_key=env.get("PROVIDER_API_KEY"),
+		provider_base_url=env.get("PROVIDER_BASE_URL"),
+		provider_model=env.get("PROVIDER_MODEL"),
+		ollama_model=env.get("OLLAMA_MODEL", "qwen2.5:3b-instruct"),
+		hf_model=env.get("HF_MODEL", "Qwen/Qwen2.5-1.5B-Instruct"),
+		hf_onnx_dir=env.get("HF_ONNX_DIR") or None,
+		hf_quantize=env.get("HF_QUANTIZE", "true").lower() == "true",
+		enable_hf=env.get("ENABLE_HF", "false").lower() == "true",
+		max_length=int(env.get("MAX_LENGTH", "220")),
+		engine_timeout=float(env.get("ENGINE_TIMEOUT", "30")),
+		batch_timeout=float(env.get("BATCH_TIMEOUT", "180")),
+		dry_run_default=env.get("DRY_RUN_DEFAULT", "true").lower() == "true",
+		twitter_wait_on_rate_limit=env.get("TWITTER_WAIT_ON_RATE_LIMIT", "false").lower() == "true",
+	)
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+@functools.lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+	"""Process-wide worker pool for blocking I/O (LLM calls), created on first use."""
+	workers = max(4, min(8, (os.cpu_count() or 1) * 2))
+	return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot")
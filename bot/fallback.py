@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Optional, Sequence
+
+from .executor import get_executor
+
+
+class CircuitBreaker:
+	"""Skip an engine for `cooldown` seconds after `threshold` consecutive failures."""
+
+	def __init__(self, threshold: int = 3, cooldown: float = 60.0):
+		self.threshold = threshold
+		self.cooldown = cooldown
+		self._failures = 0
+		self._opened_at: Optional[float] = None
+		self._lock = threading.Lock()
+
+	def allow(self) -> bool:
+		with self._lock:
+			if self._opened_at is None:
+				return True
+			if time.monotonic() - self._opened_at < self.cooldown:
+				return False
+			# Half-open: let one call through; another failure re-opens right away
+			self._opened_at = None
+			self._failures = self.threshold - 1
+			return True
+
+	def record(self, ok: bool) -> None:
+		with self._lock:
+			if ok:
+				self._failures = 0
+				self._opened_at = None
+				return
+			self._failures += 1
+			if self._failures >= self.threshold:
+				self._opened_at = time.monotonic()
+
+
+def race_first_success(
+	callables: Sequence[Callable[[], Optional[str]]],
+	timeout: float,
+	on_timeout: Optional[Callable[[int], None]] = None,
+) -> Optional[str]:
+	"""Run all callables at once and return the first non-empty result in list order.
+
+	An earlier callable's answer always wins; a later one is only used once every callable
+	ahead of it has failed or run past `timeout` seconds (counted from submission).
+	`on_timeout(i)` is called for each callable the race stopped waiting for.
+	"""
+	if not callables:
+		return None
+	deadline = time.monotonic() + timeout
+	futures = [get_executor().submit(fn) for fn in callables]
+	try:
+		for i, future in enumerate(futures):
+			try:
+				text = future.result(timeout=max(0.0, deadline - time.monotonic()))
+			except FutureTimeout:
+				text = None
+				if on_timeout is not None:
+					on_timeout(i)
+			except Exception:
+				text = None
+			if text:
+				return text
+		return None
+	finally:
+		# Drop engines that have not started yet; running ones finish in the background
+		for future in futures:
+			future.cancel()
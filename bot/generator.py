@@ -1,10 +1,72 @@
 from __future__ import annotations
 
 from typing import Optional
+import functools
 import time
 import os
+import json
+import random
+import re
+import socket
+from urllib.parse import urlsplit
 
 from .config import AppConfig
+from .fallback import CircuitBreaker, race_first_success
+from .util import format_tweet
+
+
+# Static Ollama sampling options; only the seed changes per request
+_OLLAMA_OPTIONS = {
+	"temperature": 0.95,
+	"top_p": 0.92,
+	"repeat_penalty": 1.1,
+}
+
+# Loaded HF pipelines, shared by every ContentGenerator in the process
+_HF_PIPELINES: dict[tuple[str, Optional[str], bool], object] = {}
+
+# Leading list markers ("1.", "2)", "-", "*") when a batch comes back as plain lines
+_LIST_MARKER_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+
+
+# A fact is complete once it ends in "?"/"!", or "." after a lowercase letter (not "3." or "U.S.")
+_SENTENCE_END_RE = re.compile(r"(?:[?!]|(?<=[a-z\"')])\.)[\"')]*$")
+_MIN_FACT_CHARS = 30
+
+
+def _ends_fact(parts: list[str]) -> bool:
+	"""True when the streamed parts so far hold a full 'Did you know ...' sentence.
+
+	Prefaces such as "Sure, here is a fact!" come before the marker and never count.
+	"""
+	if not parts or not any(c in parts[-1] for c in ".?!\"')"):
+		return False
+	text = "".join(parts).rstrip()
+	idx = text.lower().find("did you know")
+	if idx < 0:
+		return False
+	fact = text[idx:]
+	return len(fact) >= _MIN_FACT_CHARS and _SENTENCE_END_RE.search(fact) is not None
+
+
+def _ollama_reachable(timeout: float = 0.2) -> bool:
+	"""Cheap TCP probe of the Ollama daemon at OLLAMA_HOST (default 127.0.0.1:11434)."""
+	host = os.getenv("OLLAMA_HOST", "127.0.0.1:11434").strip() or "127.0.0.1:11434"
+	# Same port defaults as the ollama client: 11434 for a bare host, else the scheme's port
+	if "://" in host:
+		parsed = urlsplit(host)
+		default_port = {"http": 80, "https": 443}.get(parsed.scheme, 11434)
+	else:
+		parsed = urlsplit(f"http://{host}")
+		default_port = 11434
+	hostname = parsed.hostname or "127.0.0.1"
+	if hostname == "0.0.0.0":
+		hostname = "127.0.0.1"
+	try:
+		with socket.create_connection((hostname, parsed.port or default_port), timeout=timeout):
+			return True
+	except (OSError, ValueError):
+		return False
 
 
 class ContentGenerator:
@@ -13,12 +75,20 @@ class ContentGenerator:
 		self._ollama_client = None
 		self._hf_pipeline = None
 		self._openai_client = None
+		# Engines whose setup already failed (missing config, import or model load); skipped on later calls
+		self._unavailable: set[str] = set()
+		# Engines that keep failing at call time are skipped for a cool-down in auto mode
+		self._breakers: dict[str, CircuitBreaker] = {name: CircuitBreaker() for name in ("provider", "ollama", "hf")}
+		# Engines with a call still in flight, and those whose call the race already gave up on
+		self._running: set[str] = set()
+		self._timed_out: set[str] = set()
 
 	def _ensure_provider(self):
-		if self._openai_client is not None:
+		if self._openai_client is not None or "provider" in self._unavailable:
 			return
 		if not self.config.provider_api_key or not self.config.provider_base_url or not self.config.provider_model:
 			self._openai_client = None
+			self._unavailable.add("provider")
 			return
 		try:
 			from openai import OpenAI  # type: ignore
@@ -35,25 +105,72 @@ class ContentGenerator:
 			self._openai_client = OpenAI(**kwargs)
 		except Exception:
 			self._openai_client = None
+			self._unavailable.add("provider")
 
 	def _ensure_ollama(self):
-		if self._ollama_client is not None:
+		if self._ollama_client is not None or "ollama" in self._unavailable:
+			return
+		# Skip the client import (and every later call) when no daemon is listening
+		if not _ollama_reachable():
+			self._unavailable.add("ollama")
 			return
 		try:
 			import ollama  # type: ignore
 			self._ollama_client = ollama
 		except Exception:
 			self._ollama_client = None
+			self._unavailable.add("ollama")
 
 	def _ensure_hf(self):
-		if self._hf_pipeline is not None:
+		if self._hf_pipeline is not None or "hf" in self._unavailable:
+			return
+		model_name = self.config.hf_model or "gpt2"
+		key = (model_name, self.config.hf_onnx_dir, self.config.hf_quantize)
+		cached = _HF_PIPELINES.get(key)
+		if cached is not None:
+			self._hf_pipeline = cached
 			return
 		try:
 			from transformers import pipeline  # type: ignore
-			model_name = self.config.hf_model or "gpt2"
-			self._hf_pipeline = pipeline("text-generation", model=model_name)
+			pipe = self._load_onnx_pipeline()
+			if pipe is None:
+				pipe = pipeline("text-generation", model=model_name)
+				if self.config.hf_quantize:
+					self._quantize_hf(pipe)
+			self._hf_pipeline = pipe
+			_HF_PIPELINES[key] = pipe
 		except Exception:
 			self._hf_pipeline = None
+			self._unavailable.add("hf")
+
+	def _quantize_hf(self, pipe) -> None:
+		# int8 dynamic quantization of Linear layers: CPU decode is memory-bound, so this roughly halves it
+		try:
+			import torch  # type: ignore
+			device = getattr(pipe, "device", None)
+			if device is not None and getattr(device, "type", "cpu") != "cpu":
+				return
+			pipe.model = torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+		except Exception as e:
+			print(f"[hf-quantize] keeping full-precision model: {type(e).__name__}: {e}")
+
+	def _load_onnx_pipeline(self):
+		"""Load an ONNX export of the HF model if one exists, else None.
+
+		Export once with: optimum-cli export onnx --model <HF_MODEL> models/hf_onnx
+		"""
+		onnx_dir = self.config.hf_onnx_dir
+		if not onnx_dir or not os.path.isfile(os.path.join(onnx_dir, "model.onnx")):
+			return None
+		try:
+			from optimum.onnxruntime import ORTModelForCausalLM  # type: ignore
+			from transformers import AutoTokenizer, pipeline  # type: ignore
+			model = ORTModelForCausalLM.from_pretrained(onnx_dir)
+			tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+			return pipeline("text-generation", model=model, tokenizer=tokenizer)
+		except Exception as e:
+			print(f"[hf-onnx] falling back to PyTorch: {type(e).__name__}: {e}")
+			return None
 
 	def generate(self, prompt: str, preferred_engine: str = "auto") -> str:
 		engine = (preferred_engine or "auto").strip().lower()
@@ -69,18 +186,113 @@ class ContentGenerator:
 		if engine == "fallback":
 			return self._truncate(self._fallback(prompt))
 
-		# auto: try hosted provider → ollama → hf → fallback
-		text = self._try_provider(prompt)
-		if text:
-			return self._truncate(self._format_fact_out(text))
-		text = self._try_ollama(prompt)
-		if text:
-			return self._truncate(self._format_fact_out(text))
-		text = self._try_hf(prompt)
+		# auto: hosted provider → ollama → hf → fallback, with the engines running concurrently
+		text = self._first_in_priority(prompt)
 		if text:
 			return self._truncate(self._format_fact_out(text))
 		return self._truncate(self._fallback(prompt))
 
+	def _first_in_priority(self, prompt: str) -> Optional[str]:
+		"""Race the engines that are not tripped, accepting results in preference order."""
+		attempts = []
+		# The provider stops retrying once the race has given up on it
+		deadline = time.monotonic() + self.config.engine_timeout
+		provider = functools.partial(self._try_provider, deadline=deadline)
+		ollama = functools.partial(self._try_ollama, deadline=deadline)
+		names = []
+		for name, fn in (("provider", provider), ("ollama", ollama), ("hf", self._try_hf)):
+			# Loading torch/transformers costs seconds and hundreds of MB; only with ENABLE_HF
+			if name == "hf" and not self.config.enable_hf:
+				continue
+			if not self._engine_ready(name):
+				continue
+			names.append(name)
+			attempts.append(functools.partial(self._guarded, name, functools.partial(fn, prompt)))
+		return race_first_success(attempts, self.config.engine_timeout, on_timeout=lambda i: self._timed_out_engine(names[i]))
+
+	def _engine_ready(self, name: str) -> bool:
+		# Set up, not still busy with a call an earlier race gave up on, and breaker closed
+		return name not in self._unavailable and name not in self._running and self._breakers[name].allow()
+
+	def _timed_out_engine(self, name: str) -> None:
+		self._timed_out.add(name)
+		self._breakers[name].record(False)
+
+	def _guarded(self, name: str, fn) -> Optional[str]:
+		self._running.add(name)
+		try:
+			text = fn()
+		except Exception:
+			text = None
+		finally:
+			self._running.discard(name)
+		# A late failure was already counted when the race timed it out
+		if text or name not in self._timed_out:
+			self._breakers[name].record(bool(text))
+		self._timed_out.discard(name)
+		return text
+
+	def generate_many(self, prompt: str, n: int, preferred_engine: str = "auto") -> list[str]:
+		"""Generate up to n distinct facts with a single LLM request.
+
+		Only the provider and Ollama engines are asked for a batch; the result may hold
+		fewer than n facts (or none), so callers should top up with generate().
+		"""
+		engine = (preferred_engine or "auto").strip().lower()
+		system_prompt = self._facts_system_prompt(n)
+		# Room for n facts of ~60 tokens each plus JSON punctuation
+		max_tokens = min(2000, 80 * n)
+		calls = (
+			("provider", functools.partial(self._try_provider, prompt, system_prompt=system_prompt, max_tokens=max_tokens, single_fact=False)),
+			("ollama", functools.partial(self._try_ollama, prompt, system_prompt=system_prompt, single_fact=False)),
+		)
+		text: Optional[str] = None
+		for name, fn in calls:
+			if engine == name:
+				text = fn()
+			elif engine == "auto" and self._engine_ready(name):
+				# Same gate and breaker bookkeeping as the single-fact race, with a batch-sized bound
+				text = self._guarded(name, functools.partial(fn, deadline=time.monotonic() + self.config.batch_timeout))
+			if text:
+				break
+		if not text:
+			return []
+		facts: list[str] = []
+		seen: set[str] = set()
+		for item in self._parse_fact_list(text):
+			fact = self._truncate(self._format_fact_out(item))
+			if fact and fact not in seen:
+				seen.add(fact)
+				facts.append(fact)
+			if len(facts) == n:
+				break
+		return facts
+
+	def _parse_fact_list(self, text: str) -> list[str]:
+		# Prefer the JSON array we asked for; tolerate prose or code fences around it
+		start, end = text.find("["), text.rfind("]")
+		if start != -1 and end > start:
+			try:
+				data = json.loads(text[start : end + 1])
+				if isinstance(data, list):
+					return [str(x).strip() for x in data if str(x).strip()]
+			except ValueError:
+				pass
+		# Fall back to one fact per line, dropping list markers like "1." or "-"
+		lines = [_LIST_MARKER_RE.sub("", line).strip() for line in text.splitlines()]
+		return [line for line in lines if line.lower().startswith("did you know")]
+
+	def _facts_system_prompt(self, n: int) -> str:
+		return (
+			f"You generate {n} distinct interesting facts, each in exactly ONE sentence. "
+			f"Return ONLY a JSON array of {n} strings, nothing else. "
+			"Every string MUST begin with 'Did you know ' and then the fact. "
+			"End each sentence with either a '?' or '!' only (not a period). "
+			"No hashtags, no emojis, no prefaces, no disclaimers. "
+			"Use plain ASCII punctuation and keep each fact under 240 characters. "
+			"Cover a different topic in every fact."
+		)
+
 	def _fact_system_prompt(self) -> str:
 		return (
 			"You generate a single interesting fact in exactly ONE sentence. "
@@ -93,21 +305,34 @@ class ContentGenerator:
 			"If a subject is provided, make the fact about that subject; otherwise pick any topic."
 		)
 
-	def _try_provider(self, prompt: str) -> Optional[str]:
+	def _try_provider(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: Optional[int] = None, single_fact: bool = True, deadline: Optional[float] = None) -> Optional[str]:
 		self._ensure_provider()
 		if not self._openai_client or not self.config.provider_model:
 			return None
 		for attempt in range(5):
+			client = self._openai_client
+			if deadline is not None:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					return None
+				# Only calls with a deadline are bounded; batches and explicit engines keep the client defaults
+				client = client.with_options(timeout=remaining, max_retries=0)
 			try:
-				resp = self._openai_client.chat.completions.create(
+				# Retrying with identical sampling tends to reproduce an empty reply; nudge it each time
+				sampling = {"temperature": 0.7 + 0.1 * attempt}
+				if attempt:
+					sampling.update(top_p=0.95, presence_penalty=0.4)
+				# Single facts are streamed so we can stop paying for tokens past the tweet limit
+				resp = client.chat.completions.create(
 					model=self.config.provider_model,
 					messages=[
-						{"role": "system", "content": self._fact_system_prompt()},
+						{"role": "system", "content": system_prompt or self._fact_system_prompt()},
 						{"role": "user", "content": prompt.strip()},
 					],
-					temperature=0.7,
-					max_tokens=max(60, min(200, self.config.max_length)),
-					stream=False,
+					# Streamed facts are cut client-side at the first sentence; the headroom is for reasoning models
+					max_tokens=max_tokens or max(60, min(200, self.config.max_length)),
+					stream=single_fact,
+					**sampling,
 				)
 				# Non-streaming response path
 				text = ""
@@ -128,76 +353,106 @@ class ContentGenerator:
 						pass
 					text = " ".join(parts).strip()
 				elif hasattr(resp, "__iter__") and not isinstance(resp, (str, bytes)):
-					# Streaming chunks path
+					# Streaming chunks path; reasoning arrives before the answer, so keep it apart
 					chunks = []
+					reasoning = []
+					size = 0
+					limit = self.config.tweet_limit if single_fact else None
 					for chunk in resp:
 						try:
 							d = chunk.choices[0].delta
-							val = getattr(d, "content", None) or getattr(d, "reasoning", None) or ""
-							chunks.append(val)
+							val = getattr(d, "content", None)
+							if val:
+								chunks.append(val)
+								size += len(val)
+							else:
+								val = getattr(d, "reasoning", None)
+								if val:
+									reasoning.append(val)
+								continue
 						except Exception:
-							pass
-					text = ("".join(chunks)).strip()
+							continue
+						if limit is not None and (size >= limit or _ends_fact(chunks)):
+							# One sentence is all we post, and anything past the limit is truncated anyway;
+							# stop generation server-side
+							self._close_stream(resp)
+							break
+					# Like the non-streaming path: the answer wins, reasoning is only a fallback
+					text = "".join(chunks).strip() or "".join(reasoning).strip()
 				if text:
 					return text
 				else:
 					print("[provider-empty] Received no content/reasoning text")
 			except Exception as e:
 				print(f"[provider-fail attempt {attempt+1}/5] {type(e).__name__}: {e}")
-				# exponential backoff with jitter
-				delay = (2 ** attempt) * 0.75
-				time.sleep(delay)
+				if attempt < 4:
+					delay = self._next_delay(attempt)
+					if deadline is not None:
+						delay = min(delay, max(0.0, deadline - time.monotonic()))
+					time.sleep(delay)
 		return None
 
-	def _try_ollama(self, prompt: str) -> Optional[str]:
+	@staticmethod
+	def _close_stream(stream) -> None:
+		close = getattr(stream, "close", None)
+		if close is not None:
+			try:
+				close()
+			except Exception:
+				pass
+
+	def _next_delay(self, attempt: int) -> float:
+		# Capped exponential backoff with full jitter, so parallel bots don't retry in lockstep
+		return random.uniform(0, min(8.0, 0.75 * (2 ** attempt)))
+
+	def _try_ollama(self, prompt: str, system_prompt: Optional[str] = None, single_fact: bool = True, deadline: Optional[float] = None) -> Optional[str]:
+		system_prompt = system_prompt or self._fact_system_prompt()
 		self._ensure_ollama()
 		if not self._ollama_client:
 			return None
+		client = self._ollama_client
+		if deadline is not None:
+			# A short-lived client bounded by what is left of the deadline; other calls keep the default
+			client = self._ollama_client.Client(timeout=max(0.1, deadline - time.monotonic()))
 		# Prefer chat API
 		try:
 			# Add sampling options for variety and a changing seed
-			opts = {
-				"temperature": 0.95,
-				"top_p": 0.92,
-				"repeat_penalty": 1.1,
-				"seed": int(time.time() * 1000) % 2_147_483_647,
-			}
-			chat = self._ollama_client.chat(
-				model=self.config.ollama_model,
-				messages=[
-					{"role": "system", "content": self._fact_system_prompt()},
-					{"role": "user", "content": prompt.strip()},
-				],
-				options=opts,
-			)
-			# Support object or dict response
-			content = None
-			if hasattr(chat, "message") and hasattr(chat.message, "content"):
-				content = chat.message.content
-			elif isinstance(chat, dict):
-				msg = chat.get("message")
-				if isinstance(msg, dict):
-					content = msg.get("content")
-			if content:
+			opts = {**_OLLAMA_OPTIONS, "seed": random.getrandbits(31)}
+			messages = [
+				{"role": "system", "content": system_prompt},
+				{"role": "user", "content": prompt.strip()},
+			]
+			if single_fact:
+				# Stream and stop once we have enough text for one tweet
+				parts = []
+				size = 0
+				for chunk in client.chat(model=self.config.ollama_model, messages=messages, options=opts, stream=True):
+					val = self._ollama_message_content(chunk) or ""
+					parts.append(val)
+					size += len(val)
+					if size >= self.config.tweet_limit or _ends_fact(parts):
+						break
+				content = "".join(parts)
+			else:
+				chat = client.chat(model=self.config.ollama_model, messages=messages, options=opts)
+				content = self._ollama_message_content(chat)
+			if content and content.strip():
 				return str(content).strip()
 		except Exception:
 			pass
+		if deadline is not None and time.monotonic() >= deadline:
+			return None
 		# Fallback to generate API
 		try:
-			res = self._ollama_client.generate(
+			res = client.generate(
 				model=self.config.ollama_model,
 				prompt=(
-					self._fact_system_prompt()
+					system_prompt
 					+ "\n\nUser: "
 					+ prompt.strip()
 					+ "\nAssistant:"
 				),
-				options={
-					"temperature": 0.95,
-					"top_p": 0.92,
-					"repeat_penalty": 1.1,
-					"seed": int(time.time() * 1000) % 2_147_483_647,
-				},
+				options={**_OLLAMA_OPTIONS, "seed": random.getrandbits(31)},
 				stream=False,
 			)
 			text = None
@@ -209,6 +464,17 @@ class ContentGenerator:
 		except Exception:
 			return None
 
+	@staticmethod
+	def _ollama_message_content(chat) -> Optional[str]:
+		# Support object or dict response (full reply or streamed chunk)
+		if hasattr(chat, "message") and hasattr(chat.message, "content"):
+			return chat.message.content
+		if isinstance(chat, dict):
+			msg = chat.get("message")
+			if isinstance(msg, dict):
+				return msg.get("content")
+		return None
+
 	def _try_hf(self, prompt: str) -> Optional[str]:
 		self._ensure_hf()
 		if not self._hf_pipeline:
@@ -234,7 +500,6 @@ class ContentGenerator:
 	def _fallback(self, prompt: str) -> str:
 		# Heuristic fallback: simple did-you-know facts
 		try:
-			import random
 			facts = [
 				"Did you know octopuses have three hearts?",
 				"Did you know honey never spoils? Archaeologists found edible honey in ancient tombs.",
@@ -280,7 +545,6 @@ class ContentGenerator:
 		# Normalize body: strip leading connectors like "that", extra "did", punctuation
 		body = clean[len(prefix):]
 		try:
-			import re
 			# remove leading "that" with optional punctuation/spaces
 			body = re.sub(r"^(?i:that)[\s:,-]+", "", body)
 			# remove accidental leading "did "
@@ -317,6 +581,4 @@ class ContentGenerator:
 		return clean
 
 	def _truncate(self, text: str) -> str:
-		# X currently supports 280 chars for standard accounts; allow a small buffer.
-		limit = min(max(self.config.max_length, 1), 275)
-		return text[:limit]
\ No newline at end of file
+		return format_tweet(text, self.config.tweet_limit)
\ No newline at end of file
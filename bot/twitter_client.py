@@ -4,7 +4,6 @@ from typing import Optional
 import time
 
 import tweepy
-import requests
 
 from .config import AppConfig
 
@@ -28,6 +27,16 @@ class TwitterClient:
 		)
 		return self._client
 
+	def close(self) -> None:
+		# Release the pooled connections held by the cached v2 client
+		session = getattr(self._client, "session", None)
+		if session is not None:
+			try:
+				session.close()
+			except Exception:
+				pass
+		self._client = None
+
 	def upload_media_and_post(self, text: str, image_bytes: bytes, filename: str = "image.jpg", dry_run: bool = False) -> Optional[str]:
 		# Safety checks
 		if text is None or not str(text).strip():
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+# X supports 280 chars for standard accounts; keep a small buffer
+TWEET_MAX_CHARS = 275
+
+# Em/en dashes become hyphens; fancy quotes become plain ASCII quotes
+SANITIZE_TABLE = str.maketrans({"—": "-", "–": "-", "“": '"', "”": '"', "’": "'"})
+
+
+def format_tweet(text: str, limit: int) -> str:
+	"""Sanitize punctuation and cut to the tweet limit in one expression."""
+	return text.translate(SANITIZE_TABLE)[: max(1, min(limit, TWEET_MAX_CHARS))]